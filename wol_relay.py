@@ -1,13 +1,20 @@
+import atexit
+import functools
 import json
 import logging
 import os
 import shlex
+import signal
 import socket
 import subprocess
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl
 
 # Server configuration (override via environment variables if needed)
 PORT = int(os.environ.get("WOL_RELAY_PORT", "5000"))
@@ -16,6 +23,11 @@ BROADCAST_IP = os.environ.get("WOL_BROADCAST_IP", "<broadcast>")
 BROADCAST_PORT = int(os.environ.get("WOL_BROADCAST_PORT", "9"))
 SSH_BIN = os.environ.get("WOL_SSH_BIN", "ssh")
 SSH_EXTRA_ARGS = os.environ.get("WOL_SSH_EXTRA_ARGS", "")
+SSH_TIMEOUT = float(os.environ.get("WOL_SSH_TIMEOUT", "30"))
+SSH_CONTROL_PERSIST = os.environ.get("WOL_SSH_CONTROL_PERSIST", "60s")
+SSH_MAX_CONCURRENT = int(os.environ.get("WOL_SSH_MAX_CONCURRENT", "4"))
+STATUS_TTL = float(os.environ.get("WOL_STATUS_TTL", "2"))
+MAX_BODY_BYTES = int(os.environ.get("WOL_MAX_BODY_BYTES", str(64 * 1024)))
 DEFAULT_SLEEP_CMD_LINUX = os.environ.get("WOL_SLEEP_CMD_LINUX", "systemctl suspend")
 DEFAULT_SLEEP_CMD_WINDOWS = os.environ.get(
     "WOL_SLEEP_CMD_WINDOWS",
@@ -60,16 +72,77 @@ def _setup_logger() -> logging.Logger:
 
 LOGGER = _setup_logger()
 
+try:
+    # Optional C-accelerated JSON; the stdlib fallback keeps the default
+    # install dependency-free.
+    import orjson
 
-def create_magic_packet(mac_address: str) -> bytes:
-    """Create a Wake-on-LAN magic packet payload."""
-    mac_clean = mac_address.replace(":", "").replace("-", "").lower()
+    def _json_dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    _json_loads = json.loads
+
+
+# Drops the common MAC separators and lowercases hex digits in one C-level
+# pass; bytes.fromhex rejects any character that survives translation.
+_MAC_TRANS = str.maketrans(
+    {"-": None, ":": None, ".": None, " ": None, **{c: c.lower() for c in "ABCDEF"}}
+)
+
+
+def _clean_mac(mac_address: str) -> str:
+    """Strip separators from a MAC address and validate its length."""
+    mac_clean = mac_address.translate(_MAC_TRANS)
     if len(mac_clean) != 12:
         raise ValueError("Invalid MAC address format")
+    return mac_clean
+
 
+@functools.lru_cache(maxsize=256)
+def _magic_for(mac_clean: str) -> bytes:
     return b"\xFF" * 6 + bytes.fromhex(mac_clean) * 16
 
 
+def create_magic_packet(mac_address: str) -> bytes:
+    """Create a Wake-on-LAN magic packet payload.
+
+    Packets are cached per MAC so repeated wakes of the same host skip the
+    hex decode (the full cache holds ~26 KB).
+    """
+    return _magic_for(_clean_mac(mac_address))
+
+
+def _open_broadcast_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    atexit.register(sock.close)
+    return sock
+
+
+# One shared socket for all wakes; creating and tearing one down per call
+# costs three syscalls that dominate burst wake-ups under the threaded server.
+_BCAST_SOCK = _open_broadcast_socket()
+_BCAST_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=16)
+def _resolve_broadcast(broadcast_ip: str, broadcast_port: int) -> tuple:
+    """Resolve a broadcast destination to a numeric address once.
+
+    Passing "<broadcast>" (or any hostname) to sendto goes through the
+    socket layer's name resolution on every call; cache the resolved pair
+    so the hot path is a plain sendto.
+    """
+    if broadcast_ip == "<broadcast>":
+        return ("255.255.255.255", broadcast_port)
+    return (socket.gethostbyname(broadcast_ip), broadcast_port)
+
+
 def send_magic_packet(
     mac_address: str,
     broadcast_ip: str = BROADCAST_IP,
@@ -77,10 +150,80 @@ def send_magic_packet(
 ) -> None:
     """Broadcast the magic packet to the configured network."""
     packet = create_magic_packet(mac_address)
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(packet, (broadcast_ip, broadcast_port))
-    LOGGER.info("Sent magic packet to %s via %s:%s", mac_address, broadcast_ip, broadcast_port)
+    dest = _resolve_broadcast(broadcast_ip, broadcast_port)
+    with _BCAST_LOCK:
+        _BCAST_SOCK.sendto(packet, dest)
+    LOGGER.info("Sent magic packet to %s via %s:%s", mac_address, dest[0], dest[1])
+
+
+# SSH_EXTRA_ARGS is fixed at startup, so tokenize it once instead of
+# re-running shlex.split for every sleep request.
+_SSH_EXTRA = shlex.split(SSH_EXTRA_ARGS) if SSH_EXTRA_ARGS.strip() else []
+
+# Caps how many ssh children run at once; a burst of sleep requests queues
+# here instead of forking an unbounded number of clients.
+_SSH_SLOTS = threading.BoundedSemaphore(SSH_MAX_CONCURRENT)
+
+
+@functools.lru_cache(maxsize=1)
+def _ssh_control_args() -> tuple:
+    """OpenSSH multiplexing options shared by every ssh invocation.
+
+    The first connection to a host leaves a master behind for
+    SSH_CONTROL_PERSIST, so subsequent sleep commands skip the TCP and
+    auth handshake. Set WOL_SSH_CONTROL_PERSIST to an empty string to
+    disable multiplexing entirely.
+    """
+    if not SSH_CONTROL_PERSIST.strip():
+        return ()
+    ctrl_dir = Path(tempfile.gettempdir()) / "wol_relay_ssh"
+    ctrl_dir.mkdir(mode=0o700, exist_ok=True)
+    return (
+        "-o", "ControlMaster=auto",
+        "-o", f"ControlPath={ctrl_dir}/%r@%h:%p",
+        "-o", f"ControlPersist={SSH_CONTROL_PERSIST}",
+    )
+
+
+def _spawn_wait(argv: list, timeout: float) -> None:
+    """Run argv to completion with subprocess.run-compatible errors.
+
+    Uses os.posix_spawnp where available, which takes glibc's vfork fast
+    path and skips Popen's per-call FD bookkeeping; stdin/stdout are
+    redirected to /dev/null and stderr stays inherited, matching the
+    subprocess.run fallback. Raises CalledProcessError on a nonzero exit
+    and TimeoutExpired (after SIGKILL) on timeout.
+    """
+    if not hasattr(os, "posix_spawnp"):
+        subprocess.run(
+            argv,
+            check=True,
+            timeout=timeout,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+        )
+        return
+
+    file_actions = [
+        (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0o666),
+        (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0o666),
+    ]
+    pid = os.posix_spawnp(argv[0], argv, os.environ, file_actions=file_actions)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        wpid, status = os.waitpid(pid, os.WNOHANG)
+        if wpid:
+            break
+        if time.monotonic() >= deadline:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            raise subprocess.TimeoutExpired(argv, timeout)
+        time.sleep(0.05)
+
+    returncode = os.waitstatus_to_exitcode(status)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, argv)
 
 
 def trigger_sleep(
@@ -103,92 +246,166 @@ def trigger_sleep(
         else:
             raise ValueError("Unknown OS type and no custom command provided")
 
-    ssh_parts = [SSH_BIN]
-    if SSH_EXTRA_ARGS.strip():
-        ssh_parts.extend(shlex.split(SSH_EXTRA_ARGS))
-    ssh_parts.append(host)
-    ssh_parts.append(command)
+    ssh_parts = [SSH_BIN, *_ssh_control_args(), *_SSH_EXTRA, host, command]
 
     LOGGER.info("Executing sleep command on %s: %s", host, command)
-    subprocess.run(ssh_parts, check=True)
+    with _SSH_SLOTS:
+        _spawn_wait(ssh_parts, timeout=SSH_TIMEOUT)
     LOGGER.info("Succeeded sleeping host %s", host)
 
 
-def ping_host(host: str) -> bool:
-    """Ping a host and return True if online."""
-    param = "-n" if os.name == "nt" else "-c"
-    timeout_param = "-w" if os.name == "nt" else "-W"
-    # Timeout 1000ms (1s)
-    command = ["ping", param, "1", timeout_param, "1000", host]
+def probe_host(host: str, port: int, timeout: float = 2.0) -> str:
+    """Classify a host as online/sleeping/offline with a single TCP connect.
 
-    try:
-        subprocess.check_output(command, stderr=subprocess.STDOUT, timeout=2)
-        return True
-    except subprocess.CalledProcessError as exc:
-        LOGGER.debug("Ping failed for %s: %s", host, exc)
-        return False
-    except subprocess.TimeoutExpired:
-        LOGGER.warning("Ping timeout for %s", host)
-        return False
-    except Exception as exc:
-        LOGGER.warning("Ping error for %s: %s", host, exc)
-        return False
-
-
-def check_tcp_port(host: str, port: int, timeout: float = 2.0) -> bool:
-    """Try connecting to a TCP port to determine availability."""
+    A successful connect means the service answers ("online"). A refused
+    connection means the host's network stack replied but nothing listens
+    on the port, i.e. the machine is up but the service is not ("sleeping").
+    A timeout or routing error means the host is unreachable ("offline").
+    """
     try:
         with socket.create_connection((host, port), timeout=timeout):
-            return True
-    except socket.timeout:
-        LOGGER.debug("TCP connection timeout for %s:%s", host, port)
-        return False
+            return "online"
+    except ConnectionRefusedError:
+        LOGGER.debug("TCP connection refused for %s:%s (host is up)", host, port)
+        return "sleeping"
     except OSError as exc:
         LOGGER.debug("TCP connection failed for %s:%s: %s", host, port, exc)
-        return False
+        return "offline"
+
+
+# Load balancers hit /health far more often than anything else; the full
+# response is pre-encoded once so the handler is a single write.
+_HEALTH_BODY = b'{"status":"ok"}'
+_HEALTH_RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(_HEALTH_BODY)).encode() + b"\r\n"
+    b"\r\n" + _HEALTH_BODY
+)
+
+
+# Short-lived cache of probe results plus a registry of in-flight probes so
+# that N monitors polling the same target share one actual TCP connect.
+_STATUS_CACHE: Dict[tuple, tuple] = {}
+_STATUS_INFLIGHT: Dict[tuple, threading.Event] = {}
+_STATUS_LOCK = threading.Lock()
+
+
+def probe_host_cached(host: str, port: int, timeout: float = 2.0) -> str:
+    """Like probe_host, but caches results for STATUS_TTL seconds and
+    coalesces concurrent probes of the same (host, port).
+
+    Set WOL_STATUS_TTL to 0 to probe on every request.
+    """
+    if STATUS_TTL <= 0:
+        return probe_host(host, port, timeout)
+
+    key = (host, port)
+    while True:
+        with _STATUS_LOCK:
+            entry = _STATUS_CACHE.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            event = _STATUS_INFLIGHT.get(key)
+            if event is None:
+                event = _STATUS_INFLIGHT[key] = threading.Event()
+                break
+        # Another thread is probing this target; wait for it and re-check.
+        event.wait(timeout + 1.0)
+
+    try:
+        status = probe_host(host, port, timeout)
+        with _STATUS_LOCK:
+            _STATUS_CACHE[key] = (status, time.monotonic() + STATUS_TTL)
+        return status
+    finally:
+        with _STATUS_LOCK:
+            del _STATUS_INFLIGHT[key]
+        event.set()
 
 
 class RequestHandler(BaseHTTPRequestHandler):
     server_version = "WOLRelay/0.1"
+    # HTTP/1.1 keeps connections alive across requests, so pollers reuse one
+    # TCP connection; Content-Length below makes the framing explicit.
+    protocol_version = "HTTP/1.1"
+    # Small JSON responses on a kept-alive connection would otherwise sit in
+    # the kernel waiting for Nagle/delayed-ACK interaction.
+    disable_nagle_algorithm = True
 
     def _send_json(self, status_code: int, body: Dict[str, Any]) -> None:
+        payload = _json_dumps(body)
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
         self.end_headers()
-        self.wfile.write(json.dumps(body).encode())
+        self.wfile.write(payload)
+
+    # Route tables are looked up once per request instead of walking an
+    # if/elif chain; /health and /healthz both stay available for external
+    # monitors.
+    GET_ROUTES = {
+        "/health": "_handle_health",
+        "/healthz": "_handle_health",
+        "/api/status": "_handle_status",
+    }
+    POST_ROUTES = {
+        "/api/control": "_handle_control",
+        "/wake": "_handle_wake",
+        "/sleep": "_handle_sleep",
+    }
 
     def do_GET(self) -> None:
-        if self.path in {"/health", "/healthz"}:
-            # Allow both /health and /healthz for compatibility with external monitors
-            self._send_json(200, {"status": "ok"})
-        elif self.path.startswith("/api/status"):
-            self._handle_status()
-        else:
+        path, _, query = self.path.partition("?")
+        handler_name = self.GET_ROUTES.get(path)
+        if handler_name is None:
             self.send_error(404, "Not Found")
+            return
+        getattr(self, handler_name)(query)
 
     def do_POST(self) -> None:
-        content_length = int(self.headers.get("Content-Length", 0))
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            self.close_connection = True
+            self._send_json(400, {"error": "Invalid Content-Length header"})
+            return
+        if content_length < 0 or content_length > MAX_BODY_BYTES:
+            # The unread body would desync keep-alive, so drop the connection.
+            self.close_connection = True
+            self._send_json(413, {"error": "Request body too large"})
+            return
         post_data = self.rfile.read(content_length)
 
         try:
-            data = json.loads(post_data)
-        except json.JSONDecodeError:
+            data = _json_loads(post_data)
+        except ValueError:
             self._send_json(400, {"error": "Invalid JSON body"})
             return
 
+        path = self.path.partition("?")[0]
+        handler_name = self.POST_ROUTES.get(path)
+        if handler_name is None:
+            self.send_error(404, "Not Found")
+            return
+
         try:
-            if self.path == "/api/control":
-                self._handle_control(data)
-            elif self.path == "/wake":
-                self._handle_wake(data)
-            elif self.path == "/sleep":
-                self._handle_sleep(data)
-            else:
-                self.send_error(404, "Not Found")
+            getattr(self, handler_name)(data)
         except ValueError as exc:
             self._send_json(400, {"error": str(exc)})
+        except subprocess.TimeoutExpired as exc:
+            LOGGER.error("Sleep command timed out: %s", exc)
+            self._send_json(504, {
+                "error": "Sleep command timed out",
+                "timeout": exc.timeout,
+            })
         except subprocess.CalledProcessError as exc:
-            LOGGER.exception("Sleep command failed")
+            # Formatting a traceback per failure is costly under an error
+            # storm; keep the stack walk for DEBUG runs only.
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.exception("Sleep command failed")
+            else:
+                LOGGER.error("Sleep command failed: %s", exc)
             self._send_json(502, {
                 "error": "Sleep command failed",
                 "details": str(exc),
@@ -196,9 +413,17 @@ class RequestHandler(BaseHTTPRequestHandler):
                 "command": " ".join(exc.cmd) if exc.cmd else None
             })
         except Exception as exc:
-            LOGGER.exception("Unhandled error while processing %s", self.path)
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.exception("Unhandled error while processing %s", self.path)
+            else:
+                LOGGER.error("Unhandled error while processing %s: %s", self.path, exc)
             self._send_json(500, {"error": str(exc)})
 
+    def _handle_health(self, query: str) -> None:
+        # Bypasses _send_json (and request logging) for the highest-volume
+        # endpoint; the canned bytes carry their own HTTP/1.1 framing.
+        self.wfile.write(_HEALTH_RESPONSE)
+
     def _handle_control(self, data: Dict[str, Any]) -> None:
         action = (data.get("action") or "").lower()
         if action not in {"wake", "sleep"}:
@@ -246,19 +471,17 @@ class RequestHandler(BaseHTTPRequestHandler):
         trigger_sleep(host, os_type=os_type, custom_command=command)
         self._send_json(200, {"status": "success"})
 
-    def _handle_status(self) -> None:
-        from urllib.parse import urlparse, parse_qs
-
-        query = parse_qs(urlparse(self.path).query)
-        ip = query.get("ip", [None])[0]
+    def _handle_status(self, query: str) -> None:
+        params = dict(parse_qsl(query))
+        ip = params.get("ip")
 
         if not ip:
             LOGGER.warning("Status request missing IP address")
             self._send_json(400, {"error": "IP address required"})
             return
 
-        port_raw = query.get("port", [None])[0]
-        if port_raw in (None, "", []):
+        port_raw = params.get("port")
+        if port_raw in (None, ""):
             port = 22
         else:
             try:
@@ -269,25 +492,18 @@ class RequestHandler(BaseHTTPRequestHandler):
                 return
 
         LOGGER.info("Status check request: ip=%s, port=%s", ip, port)
-        ping_ok = ping_host(ip)
-        LOGGER.debug("Ping result for %s: %s", ip, ping_ok)
-        
-        if not ping_ok:
-            status = "offline"
-        else:
-            tcp_ok = check_tcp_port(ip, port)
-            LOGGER.debug("TCP check result for %s:%s: %s", ip, port, tcp_ok)
-            status = "online" if tcp_ok else "sleeping"
+        status = probe_host_cached(ip, port)
+        host_up = status != "offline"
 
-        LOGGER.info("Status check result: ip=%s, status=%s, ping=%s, tcp=%s", ip, status, ping_ok, ping_ok and (status == "online"))
+        LOGGER.info("Status check result: ip=%s, status=%s", ip, status)
         self._send_json(
             200,
             {
                 "ip": ip,
                 "port": port,
                 "status": status,
-                "ping": ping_ok,
-                "tcp": ping_ok and (status == "online"),
+                "ping": host_up,
+                "tcp": status == "online",
             },
         )
 
@@ -295,8 +511,16 @@ class RequestHandler(BaseHTTPRequestHandler):
         LOGGER.info("[%s] %s %s", self.log_date_time_string(), self.address_string(), format % args)
 
 
+class RelayServer(ThreadingHTTPServer):
+    # Do not keep the process alive waiting on in-flight ssh threads
+    daemon_threads = True
+    # Lets several relay processes share the port for multi-worker
+    # deployments (applied on Python 3.11+ where supported)
+    allow_reuse_port = True
+
+
 def run(
-    server_class=HTTPServer,
+    server_class=RelayServer,
     handler_class=RequestHandler,
     port: int = PORT,
     bind_address: str = BIND_ADDRESS,